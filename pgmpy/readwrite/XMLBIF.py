@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 
-from itertools import chain
+import sys
+from itertools import chain, repeat
 
-from io import BytesIO
+from io import BytesIO, TextIOBase
 import pyparsing as pp
 
 
@@ -11,14 +12,24 @@ import pyparsing as pp
 
 try:
     from lxml import etree
+
+    _ITERPARSE_OPTIONS = {
+        "remove_blank_text": True,
+        "collect_ids": False,
+        "huge_tree": True,
+    }
+    _PARSER = etree.XMLParser(**_ITERPARSE_OPTIONS)
 except ImportError:
     try:
         import xml.etree.ElementTree as etree
+
+        _PARSER = None
+        _ITERPARSE_OPTIONS = {}
     except ImportError:
         # try:
         #    import xml.etree.cElementTree as etree
         #    commented out because xml.etree.cElementTree is giving errors with dictionary attributes
-        print("Failed to import ElementTree from any known place")
+        raise ImportError("Failed to import ElementTree from any known place")
 
 import numpy as np
 
@@ -26,6 +37,13 @@ from pgmpy.models import BayesianModel
 from pgmpy.factors.discrete import TabularCPD, State
 
 
+def _intern(text):
+    """
+    Interns `text`, passing through the None of an empty element.
+    """
+    return text if text is None else sys.intern(text)
+
+
 class XMLBIFReader(object):
     """
     Base class for reading network file in XMLBIF format.
@@ -49,20 +67,170 @@ class XMLBIFReader(object):
         # http://www.cs.cmu.edu/~fgcozman/Research/InterchangeFormat/
         >>> reader = XMLBIFReader("xmlbif_test.xml")
         """
-        if path:
-            self.network = etree.ElementTree(file=path).getroot().find("NETWORK")
+        self.variables = []
+        self.variable_states = {}
+        self.variable_property = {}
+        self.variable_parents = {}
+        self._variable_tables = {}
+
+        if isinstance(path, TextIOBase):
+            # iterparse can only stream files opened in binary mode.
+            path, string = None, path.read()
+
+        if hasattr(path, "read"):
+            self._iterparse_network(path)
+        elif path:
+            with open(path, "rb") as f:
+                self._iterparse_network(f)
         elif string:
-            self.network = etree.fromstring(string.encode("utf-8")).find("NETWORK")
+            network = etree.fromstring(string.encode("utf-8"), _PARSER).find("NETWORK")
+            if network is None:
+                raise ValueError("No NETWORK element found in the XMLBIF string")
+            self.network_name = network.find("NAME").text
+            self._parse_network(network)
         else:
             raise ValueError("Must specify either path or string")
-        self.network_name = self.network.find("NAME").text
-        self.variables = self.get_variables()
-        self.variable_parents = self.get_parents()
+        self._state_card = {
+            variable: len(states) for variable, states in self.variable_states.items()
+        }
         self.edge_list = self.get_edges()
-        self.variable_states = self.get_states()
-        self.variable_CPD = self.get_values()
-        self.variable_property = self.get_property()
+        self.variable_CPD = self._parse_tables()
         self.state_names = self.get_states()
+        # The raw table text isn't needed once it is parsed into arrays.
+        del self._variable_tables
+
+    def _parse_network(self, network):
+        """
+        Collects the variables, states, properties, parents and the raw CPD
+        tables of the network in a single pass over the children of `network`.
+        """
+        for child in network:
+            if child.tag == "VARIABLE":
+                self._parse_variable(child)
+            elif child.tag == "DEFINITION":
+                self._parse_definition(child)
+
+    def _iterparse_network(self, f):
+        """
+        Streams the first NETWORK of the XMLBIF file `f`. Each VARIABLE and
+        DEFINITION is dropped from the tree as soon as it has been parsed, so
+        only a single one of them is held in memory at a time.
+        """
+        network = None
+        depth = 0
+        for event, elem in etree.iterparse(
+            f, events=("start", "end"), **_ITERPARSE_OPTIONS
+        ):
+            if event == "start":
+                depth += 1
+                if network is None and elem.tag == "NETWORK":
+                    network, network_depth = elem, depth
+                continue
+
+            depth -= 1
+            if network is None:
+                continue
+            elif elem is network:
+                self.network_name = network.find("NAME").text
+                break
+            # Like the in-memory parser, only direct children of NETWORK count.
+            elif depth == network_depth:
+                if elem.tag == "VARIABLE":
+                    self._parse_variable(elem)
+                elif elem.tag == "DEFINITION":
+                    self._parse_definition(elem)
+                else:
+                    continue
+                elem.clear()
+                network.remove(elem)
+
+        if network is None:
+            raise ValueError("No NETWORK element found in the XMLBIF file")
+
+    def _parse_variable(self, variable):
+        """
+        Adds the name, outcomes and properties of a VARIABLE element. Names and
+        outcomes are interned as the same few state names repeat across most
+        variables.
+        """
+        name, states, properties = None, [], []
+        for sub in variable:
+            if sub.tag == "NAME":
+                name = _intern(sub.text)
+            elif sub.tag == "OUTCOME":
+                states.append(_intern(sub.text))
+            elif sub.tag == "PROPERTY":
+                properties.append(sub.text)
+        self.variables.append(name)
+        self.variable_states[name] = states
+        self.variable_property[name] = properties
+
+    def _parse_definition(self, definition):
+        """
+        Adds the parents and the raw table text of a DEFINITION element.
+        """
+        name, parents, table = None, [], None
+        for sub in definition:
+            if sub.tag == "FOR":
+                name = _intern(sub.text)
+            elif sub.tag == "GIVEN":
+                parents.append(_intern(sub.text))
+            elif sub.tag == "TABLE":
+                table = sub.text
+        self.variable_parents[name] = parents
+        if table is not None:
+            self._variable_tables[name] = table
+
+    def _parse_tables(self):
+        """
+        Converts the raw CPD tables into arrays of shape
+        (variable_card, product of evidence_card).
+        """
+        variables = list(self._variable_tables)
+        shapes = []
+        for variable in variables:
+            for name in chain([variable], self.variable_parents[variable]):
+                if name not in self._state_card:
+                    raise ValueError(
+                        "DEFINITION of {definition} refers to undeclared variable "
+                        "{name}".format(definition=variable, name=name)
+                    )
+            columns = 1
+            for parent in self.variable_parents[variable]:
+                columns *= self._state_card[parent]
+            shapes.append((self._state_card[variable], columns))
+
+        # Parse all the tables with a single call, with a NaN sentinel after each
+        # one so that the boundary of every table can be checked. Unlike
+        # np.fromstring, converting the split tokens raises on malformed numbers.
+        text = "".join([table + " nan " for table in self._variable_tables.values()])
+        values = np.array(text.split(), dtype=np.float64)
+        sizes = [rows * columns for rows, columns in shapes]
+        ends = np.cumsum([size + 1 for size in sizes], dtype=int) - 1
+        sentinels = np.flatnonzero(np.isnan(values))
+        if values.size != sum(sizes) + len(sizes) or not np.array_equal(
+            sentinels, ends
+        ):
+            # Every boundary before the first mismatch is correct, so when all of
+            # them match the extra values belong to the last table.
+            bad = len(variables) - 1
+            for index, (end, found) in enumerate(
+                zip(ends, chain(sentinels, repeat(-1)))
+            ):
+                if end != found:
+                    bad = index
+                    break
+            raise ValueError(
+                "CPD table of {var} should contain {size} numbers to match "
+                "the cardinality of the variable and its parents".format(
+                    var=variables[bad], size=sizes[bad]
+                )
+            )
+
+        variable_CPD = {}
+        for variable, shape, size, end in zip(variables, shapes, sizes, ends):
+            variable_CPD[variable] = values[end - size : end].reshape(shape, order="F")
+        return variable_CPD
 
     def get_variables(self):
         """
@@ -74,10 +242,7 @@ class XMLBIFReader(object):
         >>> reader.get_variables()
         ['light-on', 'bowel-problem', 'dog-out', 'hear-bark', 'family-out']
         """
-        variables = [
-            variable.find("NAME").text for variable in self.network.findall("VARIABLE")
-        ]
-        return variables
+        return list(self.variables)
 
     def get_edges(self):
         """
@@ -93,9 +258,9 @@ class XMLBIFReader(object):
          ['dog-out', 'hear-bark']]
         """
         edge_list = [
-            [value, key]
-            for key in self.variable_parents
-            for value in self.variable_parents[key]
+            [parent, child]
+            for child, parents in self.variable_parents.items()
+            for parent in parents
         ]
         return edge_list
 
@@ -113,13 +278,9 @@ class XMLBIFReader(object):
          'hear-bark': ['true', 'false'],
          'light-on': ['true', 'false']}
         """
-        variable_states = {
-            variable.find("NAME").text: [
-                outcome.text for outcome in variable.findall("OUTCOME")
-            ]
-            for variable in self.network.findall("VARIABLE")
+        return {
+            variable: list(states) for variable, states in self.variable_states.items()
         }
-        return variable_states
 
     def get_parents(self):
         """
@@ -135,13 +296,10 @@ class XMLBIFReader(object):
          'hear-bark': ['dog-out'],
          'light-on': ['family-out']}
         """
-        variable_parents = {
-            definition.find("FOR").text: [
-                edge.text for edge in definition.findall("GIVEN")
-            ]
-            for definition in self.network.findall("DEFINITION")
+        return {
+            variable: list(parents)
+            for variable, parents in self.variable_parents.items()
         }
-        return variable_parents
 
     def get_values(self):
         """
@@ -162,22 +320,7 @@ class XMLBIFReader(object):
          'light-on': array([[ 0.6 ,  0.4 ],
                             [ 0.05,  0.95]])}
         """
-        variable_CPD = {
-            definition.find("FOR").text: list(map(float, table.text.split()))
-            for definition in self.network.findall("DEFINITION")
-            for table in definition.findall("TABLE")
-        }
-        for variable in variable_CPD:
-            arr = np.array(variable_CPD[variable])
-            arr = arr.reshape(
-                (
-                    len(self.variable_states[variable]),
-                    arr.size // len(self.variable_states[variable]),
-                ),
-                order="F",
-            )
-            variable_CPD[variable] = arr
-        return variable_CPD
+        return {variable: cpd.copy() for variable, cpd in self.variable_CPD.items()}
 
     def get_property(self):
         """
@@ -193,13 +336,10 @@ class XMLBIFReader(object):
          'hear-bark': ['position = (154, 241)'],
          'light-on': ['position = (73, 165)']}
         """
-        variable_property = {
-            variable.find("NAME").text: [
-                property.text for property in variable.findall("PROPERTY")
-            ]
-            for variable in self.network.findall("VARIABLE")
+        return {
+            variable: list(properties)
+            for variable, properties in self.variable_property.items()
         }
-        return variable_property
 
     def get_model(self):
         model = BayesianModel()
@@ -207,22 +347,20 @@ class XMLBIFReader(object):
         model.add_edges_from(self.edge_list)
         model.name = self.network_name
 
+        state_card = self._state_card
+        variable_parents = self.variable_parents
+        state_names = self.state_names
+
         tabular_cpds = []
         for var, values in self.variable_CPD.items():
-            evidence_card = [
-                len(self.variable_states[evidence_var])
-                for evidence_var in self.variable_parents[var]
-            ]
+            parents = variable_parents[var]
             cpd = TabularCPD(
                 var,
-                len(self.variable_states[var]),
+                state_card[var],
                 values,
-                evidence=self.variable_parents[var],
-                evidence_card=evidence_card,
-                state_names={
-                    var: self.state_names[var]
-                    for var in chain([var], self.variable_parents[var])
-                },
+                evidence=parents,
+                evidence_card=[state_card[parent] for parent in parents],
+                state_names={node: state_names[node] for node in chain([var], parents)},
             )
             tabular_cpds.append(cpd)
 
@@ -237,6 +375,15 @@ class XMLBIFReader(object):
         return model
 
 
+def _text_element(tag, text):
+    """
+    Returns a new `tag` element containing `text`.
+    """
+    elem = etree.Element(tag)
+    elem.text = text
+    return elem
+
+
 class XMLBIFWriter(object):
     """
     Base class for writing XMLBIF network file format.
@@ -273,9 +420,10 @@ class XMLBIFWriter(object):
         else:
             etree.SubElement(self.network, "NAME").text = "UNTITLED"
 
-        self.variables = self.get_variables()
-        self.states = self.get_states()
-        self.properties = self.get_properties()
+        self._cpds = {cpd.variable: cpd for cpd in self.model.get_cpds()}
+        self._sorted_variables = sorted(self.model.nodes())
+
+        self.variables, self.states, self.properties = self._add_variables()
         self.definition = self.get_definition()
         self.tables = self.get_values()
 
@@ -283,16 +431,31 @@ class XMLBIFWriter(object):
         """
         Return the XML as string.
         """
-        if self.prettyprint:
-            self.indent(self.xml)
+        return self._to_bytes().decode(self.encoding)
+
+    def _to_bytes(self):
+        """
+        Return the XML serialised in `self.encoding`.
+        """
         f = BytesIO()
         et = etree.ElementTree(self.xml)
-        et.write(f, encoding=self.encoding, xml_declaration=True)
-        return f.getvalue().decode(self.encoding)
+        if hasattr(etree, "LXML_VERSION"):
+            et.write(
+                f,
+                encoding=self.encoding,
+                xml_declaration=True,
+                pretty_print=self.prettyprint,
+            )
+        else:
+            if self.prettyprint:
+                self.indent(self.xml)
+            et.write(f, encoding=self.encoding, xml_declaration=True)
+        return f.getvalue()
 
     def indent(self, elem, level=0):
         """
-        Inplace prettyprint formatter.
+        Inplace prettyprint formatter. Only used with the stdlib ElementTree,
+        lxml pretty prints natively.
         """
         i = "\n" + level * "  "
         if len(elem):
@@ -310,7 +473,7 @@ class XMLBIFWriter(object):
 
     def get_variables(self):
         """
-        Add variables to XMLBIF
+        Returns the variable tags of XMLBIF
 
         Return
         ------
@@ -326,18 +489,11 @@ class XMLBIFWriter(object):
          'dog-out': <Element VARIABLE at 0x7fe28607ddc8>,
          'light-on': <Element VARIABLE at 0x7fe28607de88>}
         """
-        variables = self.model.nodes()
-        variable_tag = {}
-        for var in sorted(variables):
-            variable_tag[var] = etree.SubElement(
-                self.network, "VARIABLE", attrib={"TYPE": "nature"}
-            )
-            etree.SubElement(variable_tag[var], "NAME").text = var
-        return variable_tag
+        return self.variables
 
     def get_states(self):
         """
-        Add outcome to variables of XMLBIF
+        Returns the outcome tags of the variables of XMLBIF
 
         Return
         ------
@@ -353,21 +509,7 @@ class XMLBIFWriter(object):
          'hear-bark': [<Element OUTCOME at 0x7ffbabfcdf48>, <Element OUTCOME at 0x7ffbabfcdf88>],
          'light-on': [<Element OUTCOME at 0x7ffbabfcdfc8>, <Element OUTCOME at 0x7ffbabfd4048>]}
         """
-        outcome_tag = {}
-        cpds = self.model.get_cpds()
-        for cpd in cpds:
-            var = cpd.variable
-            outcome_tag[var] = []
-            if cpd.state_names is None or cpd.state_names.get(var) is None:
-                states = range(cpd.get_cardinality([var])[var])
-            else:
-                states = cpd.state_names[var]
-
-            for state in states:
-                state_tag = etree.SubElement(self.variables[var], "OUTCOME")
-                state_tag.text = self._make_valid_state_name(state)
-                outcome_tag[var].append(state_tag)
-        return outcome_tag
+        return self.states
 
     def _make_valid_state_name(self, state_name):
         """Transform the input state_name into a valid state in XMLBIF.
@@ -387,7 +529,7 @@ class XMLBIFWriter(object):
 
     def get_properties(self):
         """
-        Add property to variables in XMLBIF
+        Returns the property tags of the variables of XMLBIF
 
         Return
         ------
@@ -403,14 +545,44 @@ class XMLBIFWriter(object):
          'bowel-problem': <Element PROPERTY at 0x7f7a2ffac0c8>,
          'dog-out': <Element PROPERTY at 0x7f7a2ffac108>}
         """
-        variables = self.model.nodes()
+        return self.properties
+
+    def _add_variables(self):
+        """
+        Adds the VARIABLE tags of the model to XMLBIF, filling in the NAME,
+        OUTCOME and PROPERTY tags of each variable as it is created.
+
+        Return
+        ------
+        tuple: (variable tags, outcome tags, property tags), each a dict keyed
+            on the variable name.
+        """
+        variable_tag = {}
+        outcome_tag = {}
         property_tag = {}
-        for var in sorted(variables):
-            properties = self.model.nodes[var]
-            property_tag[var] = etree.SubElement(self.variables[var], "PROPERTY")
-            for prop, val in properties.items():
+        for var in self._sorted_variables:
+            variable_tag[var] = etree.SubElement(
+                self.network, "VARIABLE", attrib={"TYPE": "nature"}
+            )
+            etree.SubElement(variable_tag[var], "NAME").text = var
+
+            cpd = self._cpds.get(var)
+            if cpd is not None:
+                if cpd.state_names is None or cpd.state_names.get(var) is None:
+                    states = range(cpd.get_cardinality([var])[var])
+                else:
+                    states = cpd.state_names[var]
+
+                outcome_tag[var] = []
+                for state in states:
+                    state_tag = etree.SubElement(variable_tag[var], "OUTCOME")
+                    state_tag.text = self._make_valid_state_name(state)
+                    outcome_tag[var].append(state_tag)
+
+            property_tag[var] = etree.SubElement(variable_tag[var], "PROPERTY")
+            for prop, val in self.model.nodes[var].items():
                 property_tag[var].text = str(prop) + " = " + str(val)
-        return property_tag
+        return variable_tag, outcome_tag, property_tag
 
     def get_definition(self):
         """
@@ -430,14 +602,14 @@ class XMLBIFWriter(object):
          'bowel-problem': <Element DEFINITION at 0x7f1d48977348>,
          'light-on': <Element DEFINITION at 0x7f1d48977448>}
         """
-        cpds = self.model.get_cpds()
-        cpds.sort(key=lambda x: x.variable)
+        cpds = [self._cpds[var] for var in self._sorted_variables if var in self._cpds]
         definition_tag = {}
         for cpd in cpds:
             definition_tag[cpd.variable] = etree.SubElement(self.network, "DEFINITION")
-            etree.SubElement(definition_tag[cpd.variable], "FOR").text = cpd.variable
-            for parent in cpd.variables[1:]:
-                etree.SubElement(definition_tag[cpd.variable], "GIVEN").text = parent
+            definition_tag[cpd.variable].extend(
+                [_text_element("FOR", cpd.variable)]
+                + [_text_element("GIVEN", parent) for parent in cpd.variables[1:]]
+            )
 
         return definition_tag
 
@@ -459,7 +631,7 @@ class XMLBIFWriter(object):
          'family-out': <Element TABLE at 0x7f240726f408>,
          'hear-bark': <Element TABLE at 0x7f240726f448>}
         """
-        cpds = self.model.get_cpds()
+        cpds = self._cpds.values()
         definition_tag = self.definition
         table_tag = {}
         for cpd in cpds:
@@ -485,5 +657,5 @@ class XMLBIFWriter(object):
         >>> writer = XMLBIFWriter(model)
         >>> writer.write_xmlbif(test_file)
         """
-        with open(filename, "w") as fout:
-            fout.write(self.__str__())
+        with open(filename, "wb") as fout:
+            fout.write(self._to_bytes())
@@ -215,6 +215,62 @@ class TestXMLBIFReaderMethods(unittest.TestCase):
     def test_model(self):
         self.reader.get_model().check_model()
 
+    def test_getters_return_copies(self):
+        self.assertIsNot(self.reader.state_names, self.reader.variable_states)
+        self.reader.state_names["kid"].append("maybe")
+        self.reader.get_states()["kid"].append("maybe")
+        self.reader.get_parents()["dog_out"].pop()
+        self.reader.get_values()["kid"][0, 0] = 1
+        self.assertListEqual(self.reader.variable_states["kid"], ["true", "false"])
+        self.assertListEqual(
+            self.reader.variable_parents["dog_out"], ["bowel_problem", "family_out"]
+        )
+        np_test.assert_array_equal(self.reader.variable_CPD["kid"], [[0.3], [0.7]])
+
+    def test_empty_outcome(self):
+        reader = XMLBIFReader(
+            string=TEST_FILE.replace("<OUTCOME>false</OUTCOME>", "<OUTCOME/>", 1)
+        )
+        self.assertListEqual(reader.variable_states["kid"], ["true", None])
+
+    def test_undeclared_variable(self):
+        undeclared_parent = TEST_FILE.replace(
+            "<GIVEN>dog_out</GIVEN>", "<GIVEN>zzz</GIVEN>"
+        )
+        with self.assertRaisesRegex(ValueError, "hear_bark .* zzz"):
+            XMLBIFReader(string=undeclared_parent)
+
+        undeclared_variable = TEST_FILE.replace("<FOR>kid</FOR>", "<FOR>zzz</FOR>")
+        with self.assertRaisesRegex(ValueError, "zzz"):
+            XMLBIFReader(string=undeclared_variable)
+
+    def test_table_size_mismatch(self):
+        short_table = TEST_FILE.replace(
+            "<TABLE>0.7 0.3 0.01 0.99 </TABLE>", "<TABLE>0.7 0.3 0.01 </TABLE>"
+        )
+        self.assertRaises(ValueError, XMLBIFReader, string=short_table)
+
+        # A short table followed by a long one keeps the total number of values.
+        offsetting_tables = short_table.replace(
+            "<TABLE>0.15 0.85 </TABLE>", "<TABLE>0.15 0.85 0.5 </TABLE>"
+        )
+        self.assertRaises(ValueError, XMLBIFReader, string=offsetting_tables)
+
+        malformed_number = TEST_FILE.replace(
+            "<TABLE>0.7 0.3 0.01 0.99 </TABLE>", "<TABLE>0.7 0.3 0.01 0.9x9 </TABLE>"
+        )
+        self.assertRaises(ValueError, XMLBIFReader, string=malformed_number)
+
+        # Literal nan values in the last table mustn't pass for table boundaries.
+        for table in ["0.15 0.85 nan 1 2 3", "0.15 0.85 nan garbage"]:
+            self.assertRaises(
+                ValueError,
+                XMLBIFReader,
+                string=TEST_FILE.replace(
+                    "<TABLE>0.15 0.85 </TABLE>", "<TABLE>" + table + "</TABLE>"
+                ),
+            )
+
     def tearDown(self):
         del self.reader
 
@@ -300,6 +356,35 @@ class TestXMLBIFReaderMethodsFile(unittest.TestCase):
     def test_model(self):
         self.reader.get_model().check_model()
 
+    def test_read_binary_file_object(self):
+        with open("dog_problem.xml", "rb") as f:
+            reader = XMLBIFReader(f)
+        self.assertEqual(reader.network_name, "Dog_Problem")
+        self.assertListEqual(reader.variables, self.reader.variables)
+        self.assertDictEqual(reader.variable_parents, self.reader.variable_parents)
+        self.assertDictEqual(reader.variable_states, self.reader.variable_states)
+
+    def test_read_without_network(self):
+        with open("dog_problem.xml", "w") as fout:
+            fout.write('<BIF VERSION="0.3"><VARIABLE><NAME>kid</NAME></VARIABLE></BIF>')
+        self.assertRaises(ValueError, XMLBIFReader, "dog_problem.xml")
+
+    def test_read_ignores_elements_outside_network(self):
+        stray = "<VARIABLE><NAME>stray</NAME><OUTCOME>true</OUTCOME></VARIABLE>"
+        with open("dog_problem.xml", "w") as fout:
+            fout.write(
+                TEST_FILE.replace('<BIF VERSION="0.3">', '<BIF VERSION="0.3">' + stray)
+            )
+        reader = XMLBIFReader("dog_problem.xml")
+        self.assertListEqual(reader.variables, self.reader.variables)
+
+    def test_read_huge_text_node(self):
+        huge_property = "note = " + "x" * 10000001
+        with open("dog_problem.xml", "w") as fout:
+            fout.write(TEST_FILE.replace("position = (100, 165)", huge_property, 1))
+        reader = XMLBIFReader("dog_problem.xml")
+        self.assertListEqual(reader.variable_property["kid"], [huge_property])
+
     def tearDown(self):
         del self.reader
         os.remove("dog_problem.xml")
@@ -377,6 +462,24 @@ class TestXMLBIFWriterMethodsString(unittest.TestCase):
         )
         os.remove("grade_problem_output.xbif")
 
+    @unittest.skipUnless(hasattr(etree, "LXML_VERSION"), "lxml specific output")
+    def test_xml_declaration(self):
+        self.assertTrue(
+            str(self.writer).startswith(
+                "<?xml version='1.0' encoding='UTF-8'?>\n<BIF VERSION=\"0.3\">\n"
+            )
+        )
+
+    def test_write_xmlbif_encoding(self):
+        writer = XMLBIFWriter(self.expected_model, encoding="utf-16")
+        writer.write_xmlbif("dog_problem_output.xbif")
+        with open("dog_problem_output.xbif", "rb") as f:
+            self.assertEqual(f.read(), str(writer).encode("utf-16"))
+        reader = XMLBIFReader("dog_problem_output.xbif")
+        self.assertEqual(reader.network_name, "Dog_Problem")
+        self.assertSetEqual(set(reader.variables), set(self.expected_model.nodes()))
+        os.remove("dog_problem_output.xbif")
+
     @unittest.skip("Fix this when #1221 is resolved")
     def assert_models_equivelent(self, expected, got):
         self.assertSetEqual(set(expected.nodes()), set(got.nodes()))